@@ -1,7 +1,9 @@
 import logging
 from collections import defaultdict
+from typing import Iterable, List
 
 import coloredlogs
+from cognite.client.data_classes import Asset, AssetList
 from cognite.well_model.models import (
     AssetSource,
     Datum,
@@ -14,7 +16,7 @@ from cognite.well_model.models import (
 )
 
 from edm_wells import ingest_wells_and_wellbores_edm
-from utils import chunks, clean_name, clients
+from utils import MAX_WORKERS, clean_name, clients, ingest_chunks
 
 coloredlogs.install(milliseconds=True)
 log = logging.getLogger(__name__)
@@ -45,74 +47,95 @@ def get_water_depth(well_asset):
     return (Distance(value=float(well_asset.metadata["Waterdepthm"]), unit="meter"),)
 
 
-def ingest_wells_and_wellbores_osdu(well_assets, wellbore_assets, source):
-    well_ingestions = []
+def create_well_ingestion(well_asset: Asset, wellbores: List[Asset]) -> WellIngestion:
+    first_wellbore = wellbores[0] if wellbores else None
+    operator = None
+    if first_wellbore is not None:
+        operator = first_wellbore.metadata.get("CurrentOperator")
+
+    longitude = float(well_asset.metadata["Wgs84SpatialLocationX"])
+    latitude = float(well_asset.metadata["Wgs84SpatialLocationY"])
+
+    well_name = clean_name(well_asset.name)
+    return WellIngestion(
+        name=well_name,
+        description=well_name,
+        matching_id=well_name,
+        source=AssetSource(
+            asset_external_id=well_asset.external_id,
+            source_name="OSDU",
+        ),
+        wellhead=Wellhead(x=longitude, y=latitude, crs="EPSG:4326"),
+        # The `type` field is usually used to differentate production and exploratation wells.
+        type=None,
+        water_depth=get_water_depth(well_asset),
+        operator=operator,
+    )
+
+
+def create_wellbore_ingestions(
+    well_asset: Asset, wellbores: List[Asset]
+) -> List[WellboreIngestion]:
     wellbore_ingestions = []
+    for wellbore in wellbores:
+        datum = None
+        datum_elevation = wellbore.metadata.get("VerticalMeasurement_Measured_From")
+        datum_reference = wellbore.metadata.get("VerticalMeasurementType_Measured_From")
+        if datum_elevation is not None and datum_reference is not None:
+            datum = Datum(
+                value=float(datum_elevation),
+                unit=DistanceUnitEnum.meter,
+                reference=datum_reference,
+            )
 
-    # Create a dictionary from well.external_id to a list of wellbores for performance.
-    wellbores_by_parent_external_id = defaultdict(lambda: [])
-    for wb in wellbore_assets:
-        wellbores_by_parent_external_id[wb.parent_external_id].append(wb)
-
-    for well_asset in well_assets:
-        wellbores = wellbores_by_parent_external_id[well_asset.external_id]
-
-        first_wellbore = wellbores[0] if wellbores else None
-        operator = None
-        if first_wellbore is not None:
-            operator = first_wellbore.metadata.get("CurrentOperator")
-
-        longitude = float(well_asset.metadata["Wgs84SpatialLocationX"])
-        latitude = float(well_asset.metadata["Wgs84SpatialLocationY"])
-
-        well_name = clean_name(well_asset.name)
-        wi = WellIngestion(
-            name=well_name,
-            description=well_name,
-            matching_id=well_name,
+        wellbore_name = clean_name(wellbore.name)
+        wbi = WellboreIngestion(
+            name=wellbore_name,
+            description=wellbore_name,
+            matching_id=clean_name(wellbore.external_id),
+            well_asset_external_id=well_asset.external_id,
             source=AssetSource(
-                asset_external_id=well_asset.external_id,
+                asset_external_id=wellbore.external_id,
                 source_name="OSDU",
             ),
-            wellhead=Wellhead(x=longitude, y=latitude, crs="EPSG:4326"),
-            # The `type` field is usually used to differentate production and exploratation wells.
-            type=None,
-            water_depth=get_water_depth(well_asset),
-            operator=operator,
+            datum=datum,
         )
-        well_ingestions.append(wi)
-
-        for wellbore in wellbores:
-            datum_elevation = wellbore.metadata.get("VerticalMeasurement_Measured_From")
-            datum_reference = wellbore.metadata.get("VerticalMeasurementType_Measured_From")
-            if datum_elevation is not None and datum_reference is not None:
-                datum = Datum(
-                    value=float(datum_elevation),
-                    unit=DistanceUnitEnum.meter,
-                    reference=datum_reference,
-                )
-
-            wellbore_name = clean_name(wellbore.name)
-            wbi = WellboreIngestion(
-                name=wellbore_name,
-                description=wellbore_name,
-                matching_id=clean_name(wellbore.external_id),
-                well_asset_external_id=well_asset.external_id,
-                source=AssetSource(
-                    asset_external_id=wellbore.external_id,
-                    source_name="OSDU",
-                ),
-                datum=datum,
-            )
-            wellbore_ingestions.append(wbi)
+        wellbore_ingestions.append(wbi)
+    return wellbore_ingestions
 
-    log.info(f"Ingesting {len(well_ingestions)} wells and {len(wellbore_ingestions)} wellbores.")
-    for wi_chunk in chunks(well_ingestions, 1000):
-        wm.wells.ingest(wi_chunk)
 
-    log.info("Ingesting wellbores")
-    for wb_chunk in chunks(wellbore_ingestions, 1000):
-        wm.wellbores.ingest(wb_chunk)
+def ingest_wells_and_wellbores_osdu(
+    well_asset_chunks: Iterable[AssetList], wellbore_asset_chunks: Iterable[AssetList], source
+):
+    # Create a dictionary from well.external_id to a list of wellbores for performance.
+    wellbores_by_parent_external_id = defaultdict(list)
+    for wellbore_asset_chunk in wellbore_asset_chunks:
+        for wb in wellbore_asset_chunk:
+            wellbores_by_parent_external_id[wb.parent_external_id].append(wb)
+
+    # The wells are processed one chunk at a time as they are retrieved from CDF,
+    # so we never have to hold all the wells or all the ingestions in memory.
+    for well_asset_chunk in well_asset_chunks:
+        # Pop the wellbores so the dictionary shrinks as the wells are processed.
+        wells_and_wellbores = [
+            (well_asset, wellbores_by_parent_external_id.pop(well_asset.external_id, []))
+            for well_asset in well_asset_chunk
+        ]
+        well_ingestions = [
+            create_well_ingestion(well_asset, wellbores)
+            for well_asset, wellbores in wells_and_wellbores
+        ]
+        wellbore_ingestions = [
+            wbi
+            for well_asset, wellbores in wells_and_wellbores
+            for wbi in create_wellbore_ingestions(well_asset, wellbores)
+        ]
+
+        log.info(
+            f"Ingesting {len(well_ingestions)} wells and {len(wellbore_ingestions)} wellbores."
+        )
+        ingest_chunks(wm.wells.ingest, well_ingestions)
+        ingest_chunks(wm.wellbores.ingest, wellbore_ingestions)
 
 
 def main():
@@ -120,8 +143,11 @@ def main():
     setup_sources()
 
     log.info("Retrieving well and wellbore assets from OSDU...")
-    wells = client.assets.list(metadata={"FacilityType": "Well"}, limit=None)
-    wellbores = client.assets.list(metadata={"FacilityTypeID": "Wellbore"}, limit=None)
+    # Iterate over the assets in chunks instead of loading everything at once. The
+    # well chunks hold one 1000-item ingestion request per worker, so that every
+    # worker in ingest_chunks has something to do.
+    wells = client.assets(chunk_size=1000 * MAX_WORKERS, metadata={"FacilityType": "Well"})
+    wellbores = client.assets(chunk_size=1000, metadata={"FacilityTypeID": "Wellbore"})
     log.info("Ingesting wells and wellbores into WDL")
     ingest_wells_and_wellbores_osdu(wells, wellbores, "osdu")
 
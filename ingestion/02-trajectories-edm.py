@@ -1,5 +1,5 @@
 import logging
-from datetime import datetime
+import time
 from typing import Optional, Tuple
 
 import coloredlogs
@@ -94,7 +94,7 @@ def main():
     # There are a lot of trajectories, so we are "chunking" up the list of sequences
     # into eatable chunks.
     i = 0
-    start_time = datetime.now()
+    start_time = time.monotonic()
     for trajectory_chunk in chunks(trajectories, 10):
         trajectory_ingestions = []
         for trajectory in trajectory_chunk:
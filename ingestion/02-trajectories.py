@@ -1,8 +1,10 @@
 import logging
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Optional, Tuple
 
 import coloredlogs
+import numpy as np
 from cognite.client.data_classes import Sequence, SequenceData, SequenceList
 from cognite.well_model.models import (
     AngleUnitEnum,
@@ -13,8 +15,8 @@ from cognite.well_model.models import (
     TrajectoryIngestionRow,
 )
 
-from utils import chunks, clients
-from utils.log_progress import log_progress
+from utils import MAX_WORKERS, chunks, clients
+from utils.log_progress import log_progress_if
 
 coloredlogs.install()
 log = logging.getLogger(__name__)
@@ -44,11 +46,10 @@ def create_trajectory_ingestion(
         rows=[],
     )
 
+    column_indices = {col.get("externalId"): i for i, col in enumerate(sequence.columns)}
+
     def find_index(extid):
-        index = next(
-            (i for i, col in enumerate(sequence.columns) if col.get("externalId") == extid),
-            None,
-        )
+        index = column_indices.get(extid)
         if index is None:
             raise Exception(
                 f"Couldn't find column with externalId '{extid}' in sequence {sequence.external_id}"
@@ -59,18 +60,30 @@ def create_trajectory_ingestion(
     inc_index = find_index(inc_extid)
     azim_index = find_index(azim_extid)
 
-    for row_number, values in data.items():
-        md = values[md_index] * md_column.unit.factor if values[md_index] else None
-        inc = values[inc_index]
-        azim = values[azim_index] % 360.0 if values[azim_index] else None
-        if md is None or inc is None or azim is None:
-            log.warning(
-                f"Ignoring row {row_number} since one of the values are None: "
-                + f"md={md}, inclination={inc}, azimuth={azim}"
-            )
-            continue
-        row = TrajectoryIngestionRow(measured_depth=md, inclination=inc, azimuth=azim)
-        traj.rows.append(row)
+    def column(index: int) -> np.ndarray:
+        # None is converted to NaN when creating a float array.
+        return np.array([values[index] for values in data.values], dtype=float)
+
+    md = column(md_index) * md_column.unit.factor
+    inc = column(inc_index)
+    azim = column(azim_index) % 360.0
+    is_valid = np.isfinite(md) & np.isfinite(inc) & np.isfinite(azim)
+
+    for i in np.flatnonzero(~is_valid):
+        log.warning(
+            f"Ignoring row {data.row_numbers[i]} since one of the values are None/NaN: "
+            + f"md={md[i]}, inclination={inc[i]}, azimuth={azim[i]}"
+        )
+    # The values are already validated floats, so pydantic validation is skipped
+    # when creating the rows.
+    traj.rows.extend(
+        TrajectoryIngestionRow.construct(
+            measured_depth=md_value, inclination=inc_value, azimuth=azim_value
+        )
+        for md_value, inc_value, azim_value in zip(
+            md[is_valid].tolist(), inc[is_valid].tolist(), azim[is_valid].tolist()
+        )
+    )
     if not traj.rows:
         log.warning("Can't ingest trajectory since it has no rows.")
         return None
@@ -87,50 +100,69 @@ def main():
     log.info(f"Found {len(sequences)} sequences and identified {len(trajectories)} trajectories")
     print(trajectories.to_pandas())
 
-    asset_ids = [x.asset_id for x in trajectories]
-    assets = client.assets.retrieve_multiple(ids=asset_ids)
+    # retrieve_multiple already splits the ids into chunks and retrieves them
+    # concurrently, so we only need to make sure we don't ask for duplicates.
+    asset_ids = list({x.asset_id for x in trajectories if x.asset_id is not None})
+    assets = client.assets.retrieve_multiple(ids=asset_ids, ignore_unknown_ids=True)
     assets_dict = {x.id: x for x in assets}
 
+    missing_wellbore = [x for x in trajectories if x.asset_id not in assets_dict]
+    for trajectory in missing_wellbore:
+        log.warning(f"Couldn't find wellbore to connect '{trajectory.external_id}' to.")
+    trajectories = [x for x in trajectories if x.asset_id in assets_dict]
+
     # There are a lot of trajectories, so we are "chunking" up the list of sequences
     # into eatable chunks.
     i = 0
-    start_time = datetime.now()
-    for trajectory_chunk in chunks(trajectories, 10):
-        trajectory_ingestions = []
-        for trajectory in trajectory_chunk:
-            i += 1
-
-            log.info(
-                log_progress(start_time, i, len(trajectories))
-                + f" Downloading sequence data for {trajectory.external_id}"
-            )
-            wellbore = assets_dict[trajectory.asset_id]
-            data = client.sequences.data.retrieve(
-                external_id=trajectory.external_id, start=0, end=None
-            )
-            ti = create_trajectory_ingestion(
-                wellbore_asset_external_id=wellbore.external_id,
-                sequence=trajectory,
-                data=data,
-                md_column=DepthIndexColumn(
-                    unit=DistanceUnit(unit="foot"),
-                    column_external_id="MeasuredDepth",
-                    type="measured depth",
-                ),
-                inclination_column=("Inclination", AngleUnitEnum.degree),
-                azimuth_column=("Azimuth", AngleUnitEnum.degree),
-                source_name="OSDU",
-                is_definitive=True,
-            )
-            if ti is not None:
-                trajectory_ingestions.append(ti)
-
-        log.info(f"Created {len(trajectory_ingestions)} trajectory ingestions")
-        log.info(f"Ingesting {len(trajectory_ingestions)} trajectories...")
-        try:
-            wm.trajectories.ingest(trajectory_ingestions)
-        except Exception as e:
-            log.error("Failed to ingest trajectories", exc_info=e)
+    start_time = time.monotonic()
+    # Downloading sequence data is I/O-bound, so the downloads within a chunk
+    # are done concurrently.
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for trajectory_chunk in chunks(trajectories, 10):
+            futures = {}
+            for trajectory in trajectory_chunk:
+                i += 1
+
+                log.info(
+                    "%s Downloading sequence data for %s",
+                    log_progress_if(log, start_time, i, len(trajectories)),
+                    trajectory.external_id,
+                )
+                wellbore = assets_dict[trajectory.asset_id]
+                future = executor.submit(
+                    client.sequences.data.retrieve,
+                    external_id=trajectory.external_id,
+                    start=0,
+                    end=None,
+                )
+                futures[future] = (trajectory, wellbore)
+
+            trajectory_ingestions = []
+            for future in as_completed(futures):
+                trajectory, wellbore = futures[future]
+                ti = create_trajectory_ingestion(
+                    wellbore_asset_external_id=wellbore.external_id,
+                    sequence=trajectory,
+                    data=future.result(),
+                    md_column=DepthIndexColumn(
+                        unit=DistanceUnit(unit="foot"),
+                        column_external_id="MeasuredDepth",
+                        type="measured depth",
+                    ),
+                    inclination_column=("Inclination", AngleUnitEnum.degree),
+                    azimuth_column=("Azimuth", AngleUnitEnum.degree),
+                    source_name="OSDU",
+                    is_definitive=True,
+                )
+                if ti is not None:
+                    trajectory_ingestions.append(ti)
+
+            log.info(f"Created {len(trajectory_ingestions)} trajectory ingestions")
+            log.info(f"Ingesting {len(trajectory_ingestions)} trajectories...")
+            try:
+                wm.trajectories.ingest(trajectory_ingestions)
+            except Exception as e:
+                log.error("Failed to ingest trajectories", exc_info=e)
 
     log.info("DONE")
 
@@ -1,5 +1,5 @@
 import logging
-from datetime import datetime
+import time
 from typing import Dict, List, Optional
 
 import coloredlogs
@@ -75,7 +75,7 @@ def main():
     log.info(f"Found {len(already_ingested)} depth measurements already in WDL.")
     well_logs = [x for x in well_logs if x.external_id not in already_ingested]
 
-    start_time = datetime.now()
+    start_time = time.monotonic()
     for i, well_log in enumerate(well_logs):
         progress_str = log_progress(start_time, i, len(well_logs))
         log.info(f"{progress_str} Creating depth measurement ingestion for {well_log.external_id}")
@@ -1,10 +1,15 @@
+import inspect
 import logging
-import math
-from datetime import datetime
-from typing import Dict, List
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
 
 import coloredlogs
 from cognite.client.data_classes import Asset, Sequence, SequenceData, SequenceList
+from cognite.well_model import CogniteWellsClient
 from cognite.well_model.models import (
     DistanceUnitEnum,
     Lithostratigraphic,
@@ -14,49 +19,67 @@ from cognite.well_model.models import (
     WellTopSurfaceIngestion,
 )
 
-from utils import clients, chunks
-from utils.log_progress import log_progress
+from utils import MAX_WORKERS, chunks, clients
+from utils.log_progress import log_progress_if
 
 coloredlogs.install()
 log = logging.getLogger(__name__)
 
 
+# All the tops share the same few lithostratigraphic units, so the instances are reused.
+_formation = Lithostratigraphic(level=LithostratigraphicLevelEnum.formation)
+_group = Lithostratigraphic(level=LithostratigraphicLevelEnum.group)
+_member = Lithostratigraphic(level=LithostratigraphicLevelEnum.member)
+
+
 def get_litho_unit(formation_name: str):
     lower = formation_name.lower()
     if "formation" in lower:
-        return Lithostratigraphic(level=LithostratigraphicLevelEnum.formation)
+        return _formation
     elif "group" in lower:
-        return Lithostratigraphic(level=LithostratigraphicLevelEnum.group)
+        return _group
     elif "member" in lower:
-        return Lithostratigraphic(level=LithostratigraphicLevelEnum.member)
+        return _member
     return None
 
 
+@lru_cache(maxsize=None)
+def _column_indices(column_external_ids: Tuple[str, ...]) -> Tuple[int, int, int]:
+    # The well tops sequences share the same columns, so this is only computed once.
+    return (
+        column_external_ids.index("STRAT_UNIT_NM"),
+        column_external_ids.index("TOP_MD"),
+        column_external_ids.index("BASE_MD"),
+    )
+
+
 def create_well_tops(
     sequence,
     data: SequenceData,
     assets_dict: Dict[int, Asset],
 ):
-    records = data.to_pandas().to_dict("records")
+    name_index, top_index, base_index = _column_indices(tuple(data.column_external_ids))
+
     formations = []
-    for wt in records:
-        name = wt["STRAT_UNIT_NM"]
-        base_measured_depth = wt["BASE_MD"]
-        if math.isnan(base_measured_depth):
+    for row in data.values:
+        name = row[name_index]
+        top_measured_depth = row[top_index]
+        base_measured_depth = row[base_index]
+        # `x != x` is only true for NaN.
+        if top_measured_depth is None or top_measured_depth != top_measured_depth:
+            log.warning(
+                f"top '{name}' in sequence '{sequence.external_id}' has "
+                + "top_measured_depth set to NaN and is therefore ignored."
+            )
+            continue
+        if base_measured_depth is not None and base_measured_depth != base_measured_depth:
             base_measured_depth = None
         formation = WellTopSurfaceIngestion(
             name=name,
-            top_measured_depth=wt["TOP_MD"],
+            top_measured_depth=top_measured_depth,
             base_measured_depth=base_measured_depth,
             lithostratigraphic=get_litho_unit(name),
         )
-
-        if math.isnan(formation.top_measured_depth):
-            log.warning(
-                f"top '{name}' in sequence '{sequence.external_id}' has "
-                + "top_measured_depth set to NaN and is therefore ignored."
-            )
-            continue
         formations.append(formation)
     if len(formations) > 0:
         return WellTopsIngestion(
@@ -71,6 +94,36 @@ def create_well_tops(
     return None
 
 
+def get_ingested_sequence_external_ids(
+    wdl: CogniteWellsClient, wellbore_asset_external_ids: List[str]
+) -> FrozenSet[str]:
+    """Returns the sequence external ids of the well tops already in WDL
+
+    Only the well tops of the given wellbores are listed. The wellbores are
+    resolved first, since the well tops filter fails on wellbores that aren't in
+    WDL. Both endpoints accept at most 1000 wellbores per request.
+    """
+    retrieve_parameters = inspect.signature(wdl.wellbores.retrieve_multiple).parameters
+    if "ignore_unknown_ids" not in retrieve_parameters:
+        # ignore_unknown_ids was added in cognite-wells-sdk 0.15.3. Without it we
+        # can't tell which wellbores exist, so list all the well tops instead.
+        log.info("Listing all well tops, since this SDK version can't ignore unknown wellbores.")
+        return frozenset(x.source.sequence_external_id for x in wdl.well_tops.list(limit=None))
+
+    wellbore_matching_ids = [
+        x.matching_id
+        for wellbore_chunk in chunks(wellbore_asset_external_ids, 1000)
+        for x in wdl.wellbores.retrieve_multiple(
+            asset_external_ids=wellbore_chunk, ignore_unknown_ids=True
+        )
+    ]
+    return frozenset(
+        x.source.sequence_external_id
+        for wellbore_chunk in chunks(wellbore_matching_ids, 1000)
+        for x in wdl.well_tops.list(wellbore_matching_ids=wellbore_chunk, limit=None)
+    )
+
+
 def main():
     client, wdl = clients()
 
@@ -83,33 +136,85 @@ def main():
     print(well_tops.to_pandas())
 
     log.info("Retrieving CDF assets to be able to connect sequence.asset_id to asset.external_id")
-    asset_ids = list({x.asset_id for x in well_tops})
-    assets = client.assets.retrieve_multiple(ids=asset_ids)
+    asset_ids = list({x.asset_id for x in well_tops if x.asset_id is not None})
+    assets = client.assets.retrieve_multiple(ids=asset_ids, ignore_unknown_ids=True)
     assets_dict = {x.id: x for x in assets}
     log.info(f"Found {len(assets)} assets")
 
+    missing_wellbore = [x for x in well_tops if x.asset_id not in assets_dict]
+    for wt in missing_wellbore:
+        log.warning(f"Couldn't find wellbore to connect '{wt.external_id}' to.")
+    well_tops = [x for x in well_tops if x.asset_id in assets_dict]
+
     log.info("Retrieving well tops from WDL to prevent redundant work.")
-    already_ingested = {x.source.sequence_external_id for x in wdl.well_tops.list(limit=None)}
+    wellbore_asset_external_ids = sorted({assets_dict[x.asset_id].external_id for x in well_tops})
+    already_ingested = get_ingested_sequence_external_ids(wdl, wellbore_asset_external_ids)
     log.info(f"Found {len(already_ingested)} well tops already in WDL.")
     well_tops = [x for x in well_tops if x.external_id not in already_ingested]
 
-    start_time = datetime.now()
-    i = 0
-    for wt_chunk in chunks(well_tops, 100):
-        ingestions = []
-        for wt in wt_chunk:
-            i += 1
-        progress_str = log_progress(start_time, i, len(well_tops))
-        log.info(f"{progress_str} Creating well_tops ingestion for {wt.external_id}")
-        data = client.sequences.data.retrieve(id=wt.id, start=0, end=None)
-        ingestion = create_well_tops(wt, data, assets_dict)
-        if ingestion is not None:
-                ingestions.append(ingestion)
+    # Downloading sequence data and ingesting well tops are pipelined: a
+    # producer thread downloads and builds batches of ingestions while a
+    # consumer thread ingests the previous batch.
+    batches: "queue.Queue[Optional[List[WellTopsIngestion]]]" = queue.Queue(maxsize=2)
+    # Exceptions raised in either thread, re-raised once the pipeline is done. Like
+    # the old sequential loop, we stop at the first failed ingestion.
+    errors: List[Exception] = []
+    ingest_failed = threading.Event()
+
+    def download(wt: Sequence) -> Tuple[Sequence, SequenceData]:
+        return wt, client.sequences.data.retrieve(id=wt.id, start=0, end=None)
+
+    def produce():
+        start_time = time.monotonic()
+        i = 0
+        try:
+            # The sequence data within a chunk is downloaded concurrently. Lower
+            # INGESTION_MAX_WORKERS if the API starts responding with 429s.
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                for wt_chunk in chunks(well_tops, 100):
+                    if ingest_failed.is_set():
+                        break
+                    ingestions = []
+                    for wt, data in executor.map(download, wt_chunk):
+                        i += 1
+                        log.info(
+                            "%s Creating well_tops ingestion for %s",
+                            log_progress_if(log, start_time, i, len(well_tops)),
+                            wt.external_id,
+                        )
+                        ingestion = create_well_tops(wt, data, assets_dict)
+                        if ingestion is not None:
+                            ingestions.append(ingestion)
+                    batches.put(ingestions)
+        except Exception as e:
+            log.error("    Failed to create WDL well tops ingestions", exc_info=e)
+            errors.append(e)
+        finally:
+            batches.put(None)
+
+    def consume():
+        while True:
+            ingestions = batches.get()
+            if ingestions is None:
+                break
+            # Keep draining the queue after a failure so the producer isn't blocked.
+            if ingest_failed.is_set():
+                continue
             try:
-            wdl.well_tops.ingest(ingestions)
+                wdl.well_tops.ingest(ingestions)
             except Exception as e:
-                log.error("    Failed to ingest WDL depth measurements", exc_info=e)
-                break
+                log.error("    Failed to ingest WDL well tops", exc_info=e)
+                errors.append(e)
+                ingest_failed.set()
+
+    producer = threading.Thread(target=produce, daemon=True)
+    consumer = threading.Thread(target=consume, daemon=True)
+    producer.start()
+    consumer.start()
+    producer.join()
+    consumer.join()
+    if errors:
+        raise errors[0]
 
 
 if __name__ == "__main__":
@@ -13,7 +13,7 @@ from cognite.well_model.models import (
     WellIngestion,
 )
 
-from utils import chunks, clean_name
+from utils import clean_name, ingest_chunks
 from utils.measurements import parse_distance, parse_unit
 
 log = logging.getLogger(__name__)
@@ -65,11 +65,17 @@ def ingest_wells_and_wellbores_edm(
     datum_dict = {x.external_id: x for x in datums}
 
     # Create a dictionary from well.external_id to a list of wellbores for performance.
-    wellbores_by_parent_external_id = defaultdict(lambda: [])
+    wellbores_by_parent_external_id = defaultdict(list)
     for wb in wellbore_assets:
         wellbores_by_parent_external_id[wb.parent_external_id].append(wb)
 
     for well_asset in well_assets:
+        # Skip duplicate wells before parsing any of their metadata.
+        well_name = clean_name(well_asset.name)
+        if well_name in well_matching_ids:
+            continue
+        well_matching_ids.add(well_name)
+
         wellbores = wellbores_by_parent_external_id[well_asset.external_id]
 
         operator = well_asset.metadata.get("WELL_OPERATOR")
@@ -79,7 +85,6 @@ def ingest_wells_and_wellbores_edm(
 
         description = well_asset.metadata.get("WELL_DESC")
 
-        well_name = clean_name(well_asset.name)
         wi = WellIngestion(
             name=well_name,
             description=description,
@@ -95,11 +100,7 @@ def ingest_wells_and_wellbores_edm(
             operator=operator,
             spud_date=_spud_date(well_asset),
         )
-        if wi.matching_id not in well_matching_ids:
-            well_ingestions.append(wi)
-            well_matching_ids.add(wi.matching_id)  # type: ignore
-        else:
-            continue
+        well_ingestions.append(wi)
 
         for wellbore in wellbores:
             datum = None
@@ -128,9 +129,7 @@ def ingest_wells_and_wellbores_edm(
             wellbore_ingestions.append(wbi)
 
     log.info(f"Ingesting {len(well_ingestions)} wells and {len(wellbore_ingestions)} wellbores.")
-    for wi_chunk in chunks(well_ingestions, 1000):
-        wm.wells.ingest(wi_chunk)
+    ingest_chunks(wm.wells.ingest, well_ingestions)
 
     log.info("Ingesting wellbores")
-    for wb_chunk in chunks(wellbore_ingestions, 1000):
-        wm.wellbores.ingest(wb_chunk)
+    ingest_chunks(wm.wellbores.ingest, wellbore_ingestions)
@@ -1,6 +1,7 @@
 import logging
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 
 from cognite.client import CogniteClient
 from cognite.well_model import CogniteWellsClient
@@ -8,11 +9,22 @@ from cognite.well_model.wsfe import WellLogExtractorClient
 
 log = logging.getLogger(__name__)
 
+# Number of threads used by the ingestion scripts to talk to CDF concurrently.
+# The cognite-sdk shares a pool of HTTP connections between threads, whose size
+# is set by COGNITE_MAX_CONNECTION_POOL_SIZE (50 by default), so keep this below
+# that limit to avoid threads waiting on each other for a connection.
+MAX_WORKERS = int(os.environ.get("INGESTION_MAX_WORKERS", 16))
+
+
+_whitespace_regex = re.compile("[\r\n ]+")
+_well_regex = re.compile("Wellbore|Well")
+_trailing_regex = re.compile("[- ]+$")
+
 
 def clean_name(s):
-    s = re.sub("[\r\n ]+", " ", s)
-    s = re.sub("Wellbore|Well", "", s)
-    s = re.sub("[- ]+$", "", s)
+    s = _whitespace_regex.sub(" ", s)
+    s = _well_regex.sub("", s)
+    s = _trailing_regex.sub("", s)
     return s
 
 
@@ -43,3 +55,10 @@ def chunks(lst, n):
     """Yield successive n-sized chunks from lst."""
     for i in range(0, len(lst), n):
         yield lst[i : i + n]
+
+
+def ingest_chunks(ingest, lst, n=1000, max_workers=MAX_WORKERS):
+    """Call ingest on successive n-sized chunks from lst concurrently."""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Consume the results so that exceptions from ingest are raised here.
+        list(executor.map(ingest, chunks(lst, n)))
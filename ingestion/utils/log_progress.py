@@ -1,13 +1,23 @@
-from datetime import datetime
+import logging
+import time
+from datetime import datetime, timedelta
 
 
-def log_progress(start_time: datetime, done: int, total: int) -> str:
+def log_progress(start_time: float, done: int, total: int) -> str:
+    """start_time is a time.monotonic() timestamp taken when the work started."""
     done_str = str(done).rjust(len(str(total)))
     ratio = done / total
     if ratio <= 0:
         return f"[{done_str}/{total}]"
-    dt = datetime.now() - start_time
-    total_time = dt / ratio
-    finished = start_time + total_time
+    elapsed = time.monotonic() - start_time
+    remaining = elapsed / ratio - elapsed
+    finished = datetime.now() + timedelta(seconds=remaining)
     percentage = int(ratio * 100)
     return f"[{done_str}/{total} {percentage:2}% ETA={finished}]"
+
+
+def log_progress_if(logger: logging.Logger, start_time: float, done: int, total: int) -> str:
+    """Like log_progress, but returns an empty string if logger won't log INFO messages."""
+    if not logger.isEnabledFor(logging.INFO):
+        return ""
+    return log_progress(start_time, done, total)
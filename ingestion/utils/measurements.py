@@ -1,5 +1,6 @@
 import logging
 import re
+from functools import lru_cache
 from typing import Any, Callable, Dict, List, Optional
 
 from cognite.well_model import CogniteWellsClient
@@ -25,12 +26,19 @@ _unit_map = {vv: k for k, v in _unit_map_by_unit.items() for vv in v}
 _unit_regex = re.compile(r"(?P<factor>[+-]?([0-9]*[.])?[0-9]+)?\s*(?P<unit>\w+)")
 
 
+# The set of unit strings is small, so the parsed units are cached. Callers must
+# not mutate the returned DistanceUnit.
+@lru_cache(maxsize=256)
 def parse_unit(unit: str) -> Optional[DistanceUnit]:
     if unit == "mm":
         return DistanceUnit(unit=DistanceUnitEnum.meter, factor=0.001)
     if unit == "m rkb":
         # m rkb is meters based on rotary kelly bushin
         return DistanceUnit(unit=DistanceUnitEnum.meter)
+    # Most units are plain unit names without a factor, which don't need the regex.
+    u = _unit_map.get(unit)
+    if u is not None:
+        return DistanceUnit(unit=u, factor=1.0)
     match = _unit_regex.fullmatch(unit)
     if match:
         unit_match = match.group("unit")